@@ -2,110 +2,284 @@ import sys
 from itertools import combinations
 from collections import defaultdict
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # numba is optional; count_support falls back to a NumPy broadcast
+    HAS_NUMBA = False
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+# count_support works on (TXN_BLOCK x CAND_BLOCK) tiles so each candidate block stays in cache across a txn block
+TXN_BLOCK = 4096
+CAND_BLOCK = 32
+# Set to mine datasets larger than this with the Partition algorithm, one partition per PARTITION_TXNS transactions.
+# Off by default: while the transactions fit in memory a single Apriori run is faster
+PARTITION_TXNS = None
+
+FINE_LEVELS = ("Low Fine", "Medium Fine", "High Fine")
+
 
 def load_transactions(filename):
+    """Load transactions as sets of integer item ids, along with the id -> item name lookup."""
     transactions = []
+    item_to_id = {}
     try:
         with open(filename, 'r') as f:
             for line in f:
-                items = [item.strip() for item in line.strip().split(',')]
-                borough, time_period, fine_level, vehicle_type, violation_code, violation_desc = items
-
+                borough, time_period, fine_level, vehicle_type, violation_code, violation_desc = (
+                    item.strip() for item in line.split(','))
                 violation_item = f"Violation_{violation_code}_{violation_desc}"
-
-                new_items = [borough, time_period, fine_level, vehicle_type, violation_item]
-
                 hierarchical_item = f"{fine_level}_{violation_item}"
-                new_items.append(hierarchical_item)
 
-                transactions.append(set(new_items))
-        return transactions
+                transactions.append({
+                    item_to_id.setdefault(item, len(item_to_id))
+                    for item in (borough, time_period, fine_level, vehicle_type, violation_item, hierarchical_item)
+                })
+        return transactions, list(item_to_id)
     except FileNotFoundError:
         print(f"File {filename} not found")
         sys.exit(1)
 
 
-def get_itemsets(transactions, k):
-    """Generate candidate k-itemsets from transactions (initial pass for k=1)."""
-    itemsets = set()
-    for transaction in transactions:
-        for combo in combinations(sorted(transaction), k):
-            itemsets.add(frozenset(combo))
-    return itemsets
+def build_item_masks(item_names):
+    """Return the bitmask of hierarchical (violation) items, and a map from each fine level item to the bitmask of
+    its fine level/violation items."""
+    name_to_item = {name: item for item, name in enumerate(item_names)}
+    hierarchical_bits = 0
+    fine_level_children = defaultdict(int)
+
+    for item, name in enumerate(item_names):
+        if "_" in name and "Violation_" in name:
+            hierarchical_bits |= 1 << item
+            for fine_level in FINE_LEVELS:
+                if name.startswith(f"{fine_level}_Violation_") and fine_level in name_to_item:
+                    fine_level_children[name_to_item[fine_level]] |= 1 << item
+    return hierarchical_bits, dict(fine_level_children)
 
 
-def count_support(transactions, itemsets):
-    """Count the support for each itemset in the transactions."""
-    support_counts = defaultdict(int)
+def iter_bits(mask):
+    """Yield the indices of the set bits in a bitmask, lowest first."""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+def encode_itemset(itemset, item_to_bit):
+    """Encode an itemset as an integer bitmask."""
+    mask = 0
+    for item in itemset:
+        mask |= 1 << item_to_bit[item]
+    return mask
+
+
+def encode_transactions(transactions):
+    """Assign each item a bit index (most frequent items get the lowest bits) and encode transactions as bitmasks."""
+    item_counts = defaultdict(int)
     for transaction in transactions:
-        for itemset in itemsets:
-            if itemset.issubset(transaction):
-                support_counts[itemset] += 1
+        for item in transaction:
+            item_counts[item] += 1
+
+    ordered_items = sorted(item_counts, key=lambda item: (-item_counts[item], item))
+    item_to_bit = {item: bit for bit, item in enumerate(ordered_items)}
+    txn_masks = [encode_itemset(transaction, item_to_bit) for transaction in transactions]
+    return txn_masks, item_to_bit
+
+
+def to_word_matrix(masks, n_words):
+    """Pack integer bitmasks into a (len(masks), n_words) uint64 matrix, lowest word first."""
+    rows = [[(mask >> (WORD_BITS * word)) & WORD_MASK for word in range(n_words)] for mask in masks]
+    return np.array(rows, dtype=np.uint64).reshape(len(rows), n_words)
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def count_support_words(txn_words, cand_words, counts):
+        """Count the transaction rows containing each candidate row (JIT-compiled, parallel over candidate blocks)."""
+        n_txns, n_cands, n_words = txn_words.shape[0], cand_words.shape[0], cand_words.shape[1]
+        for block in prange((n_cands + CAND_BLOCK - 1) // CAND_BLOCK):
+            cand_start = block * CAND_BLOCK
+            cand_end = min(cand_start + CAND_BLOCK, n_cands)
+            for txn_start in range(0, n_txns, TXN_BLOCK):
+                txn_end = min(txn_start + TXN_BLOCK, n_txns)
+                for c in range(cand_start, cand_end):
+                    hits = 0
+                    for t in range(txn_start, txn_end):
+                        contained = True
+                        for w in range(n_words):
+                            if (txn_words[t, w] & cand_words[c, w]) != cand_words[c, w]:
+                                contained = False
+                                break
+                        if contained:
+                            hits += 1
+                    counts[c] += hits
+
+
+def count_word_support(txn_words, cand_words):
+    """Count the transaction rows containing each candidate row of the packed word matrices."""
+    counts = np.zeros(len(cand_words), dtype=np.int64)
+    if HAS_NUMBA:
+        count_support_words(txn_words, cand_words, counts)
+        return counts
+
+    for cand_start in range(0, len(cand_words), CAND_BLOCK):
+        cands = cand_words[None, cand_start:cand_start + CAND_BLOCK, :]
+        for txn_start in range(0, len(txn_words), TXN_BLOCK):
+            txns = txn_words[txn_start:txn_start + TXN_BLOCK, None, :]
+            counts[cand_start:cand_start + CAND_BLOCK] += ((txns & cands) == cands).all(axis=2).sum(axis=0)
+    return counts
+
+
+def count_support(txn_matrix, cand_masks):
+    """Count the support for each candidate bitmask against the packed transaction matrix."""
+    cand_masks = list(cand_masks)
+    if not cand_masks:
+        return {}
+
+    # Frequent items sit on the lowest bits, so later passes only need the first few words
+    n_words = -(-max(cand.bit_length() for cand in cand_masks) // WORD_BITS)
+    txn_words = np.ascontiguousarray(txn_matrix[:, :n_words])
+    cand_words = to_word_matrix(cand_masks, n_words)
+    counts = count_word_support(txn_words, cand_words)
+    return dict(zip(cand_masks, counts.tolist()))
+
+
+def union_mask(itemsets):
+    """Return the bitmask of every item appearing in any of the itemsets."""
+    mask = 0
+    for itemset in itemsets:
+        mask |= itemset
+    return mask
+
+
+def reduce_transactions(txn_masks, item_mask, k):
+    """Transaction reduction: keep only the items in item_mask and drop transactions left with k or fewer items.
+
+    txn_masks maps transaction ids to bitmasks. When item_mask covers the frequent k-itemsets, a dropped transaction
+    cannot contain any (k+1)-candidate."""
+    reduced = {}
+    for tid, txn in txn_masks.items():
+        txn &= item_mask
+        if txn.bit_count() > k:
+            reduced[tid] = txn
+    return reduced
+
+
+def build_tidlists(txn_masks, item_mask):
+    """Build a vertical index mapping each item bit in item_mask to the ids of the transactions containing it."""
+    tidlists = {bit: set() for bit in iter_bits(item_mask)}
+    for tid, txn in txn_masks.items():
+        for bit in iter_bits(txn & item_mask):
+            tidlists[bit].add(tid)
+    return tidlists
+
+
+def build_candidate_trie(cand_masks, item_order):
+    """Insert each candidate into a prefix trie of nested dicts keyed by item bit, with items taken in item_order.
+
+    The node completing a candidate holds its bitmask under the None key."""
+    rank = {bit: position for position, bit in enumerate(item_order)}
+    trie = {}
+    for cand in cand_masks:
+        node = trie
+        for bit in sorted(iter_bits(cand), key=rank.__getitem__):
+            node = node.setdefault(bit, {})
+        node[None] = cand
+    return trie
+
+
+def count_support_vertical(tidlists, cand_masks, min_support_count):
+    """Count the support for each candidate bitmask by intersecting the tid-lists of its items, smallest first.
+
+    Candidates sharing a prefix in the candidate trie share its intersection. A subtrie is abandoned as soon as
+    its running intersection drops below min_support_count, and its candidates are left out of the result."""
+    item_order = sorted(tidlists, key=lambda bit: len(tidlists[bit]))
+    trie = build_candidate_trie(cand_masks, item_order)
+
+    support_counts = {}
+    stack = [(trie, None)]
+    while stack:
+        node, tids = stack.pop()
+        for bit, child in node.items():
+            if bit is None:
+                support_counts[child] = len(tids)
+                continue
+            child_tids = tidlists[bit] if tids is None else tids & tidlists[bit]
+            if len(child_tids) >= min_support_count:
+                stack.append((child, child_tids))
     return support_counts
 
 
 def filter_frequent_itemsets(support_counts, min_sup, total_transactions):
     """Filter itemsets that meet the minimum support threshold."""
-    min_support_count = min_sup * total_transactions
+    # An itemset must occur at least once, even when min_sup is 0
+    min_support_count = max(min_sup * total_transactions, 1)
     frequent_itemsets = {itemset: count for itemset, count in support_counts.items() if count >= min_support_count}
     return frequent_itemsets
 
 
 def generate_candidates(frequent_itemsets, k):
     """Generate candidate k-itemsets from frequent (k-1)-itemsets (Apriori-gen from Section 2.1.1)."""
-    candidates = set()
-    freq_list = [set(itemset) for itemset in frequent_itemsets.keys()]
-
-    for i in range(len(freq_list)):
-        for j in range(i + 1, len(freq_list)):
-            itemset1 = freq_list[i]
-            itemset2 = freq_list[j]
-            union = itemset1.union(itemset2)
-            if len(union) == k:
-                candidates.add(frozenset(union))
+    # Join step: itemsets sharing the same (k-2)-prefix differ only in their highest item
+    groups = defaultdict(list)
+    for itemset in frequent_itemsets:
+        last_bit = 1 << (itemset.bit_length() - 1)
+        groups[itemset ^ last_bit].append(last_bit)
 
-    final_candidates = set()
-    for candidate in candidates:
-        all_subsets_frequent = True
-        for subset in combinations(candidate, k - 1):
-            if frozenset(subset) not in frequent_itemsets:
-                all_subsets_frequent = False
-                break
-        if all_subsets_frequent:
-            final_candidates.add(candidate)
+    frequent_keys = frozenset(frequent_itemsets)
+    candidates = set()
+    for prefix, last_bits in groups.items():
+        prefix_bits = [1 << bit for bit in iter_bits(prefix)]
+        for a, b in combinations(last_bits, 2):
+            candidate = prefix | a | b
+            # Prune step: dropping a or b gives back the joined itemsets, so only subsets missing a prefix item are
+            # left to check
+            if all(candidate ^ bit in frequent_keys for bit in prefix_bits):
+                candidates.add(candidate)
 
-    return final_candidates
+    return candidates
 
 
 def find_maximal_frequent_itemsets(frequent_itemsets):
     """Identify maximal frequent itemsets (not subsets of any other frequent itemset)."""
-    maximal = set()
-    sorted_itemsets = sorted(frequent_itemsets.keys(), key=len, reverse=True)
+    by_size = defaultdict(list)
+    for itemset in frequent_itemsets:
+        by_size[itemset.bit_count()].append(itemset)
 
-    for itemset in sorted_itemsets:
-        is_maximal = True
-        for other in maximal:
-            if itemset.issubset(other):
-                is_maximal = False
-                break
-        if is_maximal:
-            maximal.add(itemset)
+    # An itemset only needs checking against strictly larger maximal itemsets
+    maximal = []
+    for size in sorted(by_size, reverse=True):
+        larger = maximal.copy()
+        for itemset in by_size[size]:
+            if not any((itemset & other) == itemset for other in larger):
+                maximal.append(itemset)
 
-    return maximal
+    return set(maximal)
 
 
-def apriori(transactions, min_sup):
-    """Run the Apriori algorithm with variations."""
-    total_transactions = len(transactions)
+def mine_frequent_itemsets(txn_masks, min_sup):
+    """Find every frequent itemset (with its support count) in the transaction bitmasks, level by level."""
+    total_transactions = len(txn_masks)
+    all_items = union_mask(txn_masks)
+    txn_matrix = to_word_matrix(txn_masks, -(-all_items.bit_length() // WORD_BITS))
 
     # Step 1: Generate frequent 1-itemsets
     k = 1
-    candidate_itemsets = get_itemsets(transactions, k)
-    support_counts = count_support(transactions, candidate_itemsets)
+    candidate_itemsets = [1 << bit for bit in iter_bits(all_items)]
+    support_counts = count_support(txn_matrix, candidate_itemsets)
     frequent_itemsets = filter_frequent_itemsets(support_counts, min_sup, total_transactions)
 
+    # Later passes count support vertically, so only frequent items need a tid-list
+    frequent_item_mask = union_mask(frequent_itemsets)
+    txn_masks = reduce_transactions(dict(enumerate(txn_masks)), frequent_item_mask, k)
+    tidlists = build_tidlists(txn_masks, frequent_item_mask)
+    # Clamped like in filter_frequent_itemsets, so empty intersections are never counted
+    min_support_count = max(min_sup * total_transactions, 1)
+
     all_frequent_itemsets = frequent_itemsets.copy()
-    all_support_counts = support_counts.copy()
 
     # Step 2: Iteratively generate frequent k-itemsets
     k += 1
@@ -114,71 +288,105 @@ def apriori(transactions, min_sup):
         if not candidates:
             break
 
-        support_counts = count_support(transactions, candidates)
+        support_counts = count_support_vertical(tidlists, candidates, min_support_count)
         frequent_itemsets = filter_frequent_itemsets(support_counts, min_sup, total_transactions)
 
         all_frequent_itemsets.update(frequent_itemsets)
-        all_support_counts.update(support_counts)
+
+        # Shrink the transactions and tid-lists to what can still contribute to a (k+1)-itemset
+        frequent_item_mask = union_mask(frequent_itemsets)
+        txn_masks = reduce_transactions(txn_masks, frequent_item_mask, k)
+        surviving_tids = set(txn_masks)
+        tidlists = {bit: tidlists[bit] & surviving_tids for bit in iter_bits(frequent_item_mask)}
 
         k += 1
 
+    return all_frequent_itemsets
+
+
+def apriori(txn_masks, min_sup):
+    """Run the Apriori algorithm with variations over transaction bitmasks."""
+    frequent_itemsets = mine_frequent_itemsets(txn_masks, min_sup)
+
     # Step 3: Find maximal frequent itemsets for rule generation
-    maximal_frequent = find_maximal_frequent_itemsets(all_frequent_itemsets)
+    maximal_frequent = find_maximal_frequent_itemsets(frequent_itemsets)
 
-    return all_frequent_itemsets, all_support_counts, maximal_frequent, total_transactions
+    return frequent_itemsets, maximal_frequent, len(txn_masks)
 
 
-def generate_rules(maximal_frequent, support_counts, min_conf, total_transactions):
-    """Generate association rules from maximal frequent itemsets with exactly one item on the RHS."""
-    rules = []
-    fine_levels = {"Low Fine", "Medium Fine", "High Fine"}
+def partition_apriori(txn_masks, min_sup, partitions):
+    """Run the Partition algorithm: mine each partition level by level, then count the union of the local frequent
+    itemsets over all transactions in a single pass.
 
+    An itemset that is frequent overall is frequent in at least one partition at the same min_sup, so the union
+    is a superset of the global frequent itemsets."""
+    if partitions <= 1:
+        return apriori(txn_masks, min_sup)
+
+    total_transactions = len(txn_masks)
+    bounds = np.linspace(0, total_transactions, partitions + 1, dtype=int).tolist()
+    candidates = set()
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        candidates.update(mine_frequent_itemsets(txn_masks[start:stop], min_sup))
+
+    # Verify the candidates over all transactions with the same tid-list intersections the level-wise passes use
+    candidate_item_mask = union_mask(candidates)
+    tidlists = build_tidlists(dict(enumerate(txn_masks)), candidate_item_mask)
+    support_counts = count_support_vertical(tidlists, candidates, max(min_sup * total_transactions, 1))
+    frequent_itemsets = filter_frequent_itemsets(support_counts, min_sup, total_transactions)
+    maximal_frequent = find_maximal_frequent_itemsets(frequent_itemsets)
+
+    return frequent_itemsets, maximal_frequent, total_transactions
+
+
+def generate_rules(maximal_frequent, support_counts, min_conf, total_transactions, hierarchical_bits,
+                   fine_level_children):
+    """Generate association rules from maximal frequent itemsets with exactly one item on the RHS."""
+    # Hierarchical items never appear on the RHS, and a fine level is trivially implied by any of its fine
+    # level/violation items on the LHS
+    lhs_masks, rhs_masks, itemset_supports = [], [], []
     for itemset in maximal_frequent:
-        support = support_counts[itemset]
-        if len(itemset) < 2:  # Skip 1-itemsets
+        if itemset.bit_count() < 2:  # Skip 1-itemsets
             continue
 
-        # Consider each item in the itemset as the RHS
-        for rhs_item in itemset:
-            # Skip hierarchical items as RHS
-            if "_" in rhs_item and "Violation_" in rhs_item:
-                continue
-            rhs = frozenset([rhs_item])  # Exactly one item on the RHS
-            lhs = frozenset(itemset - rhs)
-            if not lhs:  # Ensure LHS has at least one item
+        # Consider each non-hierarchical item in the itemset as the RHS
+        for rhs_item in iter_bits(itemset & ~hierarchical_bits):
+            rhs = 1 << rhs_item  # Exactly one item on the RHS
+            lhs = itemset ^ rhs
+            if lhs & fine_level_children.get(rhs_item, 0):
                 continue
+            lhs_masks.append(lhs)
+            rhs_masks.append(rhs)
+            itemset_supports.append(support_counts[itemset])
 
-            # Check for trivial rules: if RHS is a fine level, skip if LHS contains a hierarchical item with that fine level
-            if rhs_item in fine_levels:
-                is_trivial = False
-                for lhs_item in lhs:
-                    if lhs_item.startswith(f"{rhs_item}_Violation_"):
-                        is_trivial = True
-                        break
-                if is_trivial:
-                    continue
-
-            # Compute confidence
-            lhs_support = support_counts.get(lhs, 0)
-            if lhs_support == 0:
-                continue
-            confidence = support / lhs_support
-            if confidence >= min_conf:
-                rule_support = support / total_transactions
-                rules.append((lhs, rhs, rule_support, confidence))
+    if not lhs_masks:
+        return []
+
+    # Compute all confidences in one pass
+    supports = np.array(itemset_supports, dtype=np.float64)
+    lhs_supports = np.array([support_counts.get(lhs, 0) for lhs in lhs_masks], dtype=np.float64)
+    confidences = np.divide(supports, lhs_supports, out=np.zeros_like(supports), where=lhs_supports > 0)
+    keep = np.nonzero((lhs_supports > 0) & (confidences >= min_conf))[0]
+
+    rule_supports = (supports / total_transactions).tolist()
+    confidences = confidences.tolist()
+    return [(lhs_masks[i], rhs_masks[i], rule_supports[i], confidences[i]) for i in keep.tolist()]
 
-    return rules
 
+def save_results(frequent_itemsets, rules, total_transactions, min_sup, min_conf, item_names):
+    """Save frequent itemsets and high-confidence rules to output.txt, mapping item bits back to their names."""
+    def names(mask):
+        return tuple(sorted(item_names[bit] for bit in iter_bits(mask)))
 
-def save_results(frequent_itemsets, rules, total_transactions, min_sup, min_conf):
-    """Save frequent itemsets and high-confidence rules to output.txt."""
     with open("output.txt", "w") as f:
         # Part 1: Frequent itemsets
         f.write(f"==Frequent itemsets (min_sup={min_sup * 100}%)\n")
-        sorted_itemsets = sorted(frequent_itemsets.items(), key=lambda x: (-x[1], sorted(x[0])))
-        for itemset, support in sorted_itemsets:
+        # Decode each itemset's sorted names once and reuse them as both sort key and output
+        sorted_itemsets = [(names(itemset), support) for itemset, support in frequent_itemsets.items()]
+        sorted_itemsets.sort(key=lambda x: (-x[1], x[0]))
+        for itemset_names, support in sorted_itemsets:
             support_percent = (support / total_transactions) * 100
-            items = ",".join(sorted(itemset))
+            items = ",".join(itemset_names)
             f.write(f"[{items}], {support_percent:.1f}%\n")
 
         # Part 2: High-confidence rules
@@ -187,8 +395,8 @@ def save_results(frequent_itemsets, rules, total_transactions, min_sup, min_conf
         for lhs, rhs, support, confidence in sorted_rules:
             support_percent = support * 100
             confidence_percent = confidence * 100
-            lhs_items = ",".join(sorted(lhs))
-            rhs_items = ",".join(sorted(rhs))
+            lhs_items = ",".join(names(lhs))
+            rhs_items = ",".join(names(rhs))
             f.write(f"[{lhs_items}] => [{rhs_items}] (Conf: {confidence_percent:.1f}%, Supp: {support_percent:.1f}%)\n")
 
 
@@ -207,10 +415,18 @@ def main():
         print("min_sup and min_conf must be numbers between 0 and 1")
         sys.exit(1)
 
-    transactions = load_transactions(filename)
-    frequent_itemsets, support_counts, maximal_frequent, total_transactions = apriori(transactions, min_sup)
-    rules = generate_rules(maximal_frequent, support_counts, min_conf, total_transactions)
-    save_results(frequent_itemsets, rules, total_transactions, min_sup, min_conf)
+    transactions, id_to_item = load_transactions(filename)
+    txn_masks, item_to_bit = encode_transactions(transactions)
+    # From here on items are identified by their bit index
+    item_names = [id_to_item[item] for item in sorted(item_to_bit, key=item_to_bit.get)]
+    hierarchical_bits, fine_level_children = build_item_masks(item_names)
+
+    partitions = -(-len(txn_masks) // PARTITION_TXNS) if PARTITION_TXNS else 1
+    frequent_itemsets, maximal_frequent, total_transactions = partition_apriori(txn_masks, min_sup, partitions)
+    # Every LHS is a subset of a frequent itemset, so the frequent supports are all generate_rules needs
+    rules = generate_rules(maximal_frequent, frequent_itemsets, min_conf, total_transactions, hierarchical_bits,
+                           fine_level_children)
+    save_results(frequent_itemsets, rules, total_transactions, min_sup, min_conf, item_names)
 
     print(f"Results written to output.txt")
 
@@ -1,129 +1,128 @@
+import hashlib
+import os
+
+import numpy as np
 import pandas as pd
 
-# Load Violation Code mappings from Excel
-violation_codes_df = pd.read_excel("data/ParkingViolationCodes_January2020.xlsx")
-VIOLATION_CODE_TO_DESC = dict(zip(violation_codes_df["VIOLATION CODE"], violation_codes_df["VIOLATION DESCRIPTION"]))
-VIOLATION_CODE_TO_FINE = dict(
-    zip(violation_codes_df["VIOLATION CODE"], violation_codes_df["All Other Areas\n(Fine Amount $)"]))
+PARKING_FILE = "data/parking_first_march_2025.csv"
+VIOLATION_CODES_FILE = "data/ParkingViolationCodes_January2020.xlsx"
+CACHE_DIR = ".cache"
 
+VEHICLE_TYPE_MAP = {
+    'SDN': 'Sedan', '2DSD': 'Sedan', '4DSD': 'Sedan',
+    'SUBN': 'SUV', 'PICK': 'Pickup', 'VAN': 'Van'
+}
+COUNTY_TO_BOROUGH = {
+    'NY': 'Manhattan',
+    'MN': 'Manhattan',
+    'BK': 'Brooklyn',
+    'K': 'Brooklyn',
+    'Kings': 'Brooklyn',
+    'QN': 'Queens',
+    'Q': 'Queens',
+    'Qns': 'Queens',
+    'BX': 'Bronx',
+    'Bronx': 'Bronx',
+    'R': 'Staten Island',
+    'ST': 'Staten Island'
+}
 
-def discretize_fine(amount):
-    if amount < 50:
-        return "Low Fine"
-    elif 50 <= amount <= 100:
-        return "Medium Fine"
-    else:
-        return "High Fine"
-
-
-def discretize_time(time_str):
-    try:
-        if not isinstance(time_str, str) or not time_str:
-            return "Unknown Time"
-        time_str = time_str.strip()
-
-        # Handle formats like "0730A" or "0730P"
-        if len(time_str) >= 5 and time_str[-1] in ['A', 'P']:
-            time_clean = f"{time_str[:2]}:{time_str[2:4]} {'AM' if time_str[-1] == 'A' else 'PM'}"
-        elif ":" in time_str:
-            time_clean = time_str
-        else:
-            return "Unknown Time"
-
-        hour = pd.to_datetime(time_clean, format="%H:%M %p", errors="coerce").hour
-        if pd.isna(hour):
-            hour = pd.to_datetime(time_clean, format="%H:%M", errors="coerce").hour
-        if pd.isna(hour):
-            print(f"Failed to parse time: {time_str}")
-            return "Unknown Time"
-
-        if 6 <= hour < 12:
-            return "Morning"
-        elif 12 <= hour < 18:
-            return "Afternoon"
-        elif 18 <= hour < 24:
-            return "Evening"
-        else:
-            return "Night"
-    except Exception as e:
-        print(f"Error parsing time '{time_str}': {e}")
-        return "Unknown Time"
-
-
-def standardize_vehicle_type(vehicle_type):
-    if not isinstance(vehicle_type, str) or not vehicle_type:
-        return "Unknown Vehicle"
-    vehicle_type = vehicle_type.upper()
-    vehicle_map = {
-        'SDN': 'Sedan', '2DSD': 'Sedan', '4DSD': 'Sedan',
-        'SUBN': 'SUV', 'PICK': 'Pickup', 'VAN': 'Van'
-    }
-    return vehicle_map.get(vehicle_type, "Other Vehicle")
-
-
-def map_county_to_borough(county):
-    if not isinstance(county, str):
-        return None
-    county = county.upper()
-    county_to_borough = {
-        'NY': 'Manhattan',
-        'MN': 'Manhattan',
-        'BK': 'Brooklyn',
-        'K': 'Brooklyn',
-        'Kings': 'Brooklyn',
-        'QN': 'Queens',
-        'Q': 'Queens',
-        'Qns': 'Queens',
-        'BX': 'Bronx',
-        'Bronx': 'Bronx',
-        'R': 'Staten Island',
-        'ST': 'Staten Island'
-    }
-    return county_to_borough.get(county, None)
 
+def discretize_fine(amounts):
+    return pd.Series(
+        np.select([amounts < 50, amounts <= 100], ["Low Fine", "Medium Fine"], "High Fine"),
+        index=amounts.index)
+
+
+def discretize_time(time_strs):
+    time_strs = time_strs.str.strip()
+
+    # Handle formats like "0730A" or "0730P"
+    is_am_pm = (time_strs.str.len() >= 5) & time_strs.str[-1].isin(['A', 'P'])
+    am_pm = time_strs.str[:2] + ":" + time_strs.str[2:4] + " " + time_strs.str[-1].map({'A': 'AM', 'P': 'PM'})
+    time_clean = am_pm.where(is_am_pm, time_strs.where(time_strs.str.contains(":", regex=False, na=False)))
+
+    hours = pd.to_datetime(time_clean, format="%H:%M %p", errors="coerce").dt.hour
+    hours = hours.fillna(pd.to_datetime(time_clean, format="%H:%M", errors="coerce").dt.hour)
+    for time_str in time_strs[time_clean.notna() & hours.isna()]:
+        print(f"Failed to parse time: {time_str}")
+
+    periods = pd.cut(hours, bins=[0, 6, 12, 18, 24], right=False, labels=["Night", "Morning", "Afternoon", "Evening"])
+    return periods.astype(object).fillna("Unknown Time")
+
+
+def standardize_vehicle_type(vehicle_types):
+    standardized = vehicle_types.str.upper().map(VEHICLE_TYPE_MAP).fillna("Other Vehicle")
+    return standardized.mask(vehicle_types.isna() | (vehicle_types == ""), "Unknown Vehicle")
+
+
+def map_county_to_borough(counties):
+    return counties.str.upper().map(COUNTY_TO_BOROUGH)
 
-def preprocess():
-    parking = pd.read_csv("data/parking_first_march_2025.csv", low_memory=False)
+
+def load_violation_codes():
+    # Load Violation Code mappings from Excel
+    violation_codes_df = pd.read_excel(VIOLATION_CODES_FILE)
+    code_to_desc = dict(zip(violation_codes_df["VIOLATION CODE"], violation_codes_df["VIOLATION DESCRIPTION"]))
+    code_to_fine = dict(
+        zip(violation_codes_df["VIOLATION CODE"], violation_codes_df["All Other Areas\n(Fine Amount $)"]))
+    return code_to_desc, code_to_fine
+
+
+def clean_parking_data():
+    violation_code_to_desc, violation_code_to_fine = load_violation_codes()
+    parking = pd.read_csv(PARKING_FILE, low_memory=False)
 
     parking['Issue Date'] = pd.to_datetime(parking['Issue Date'], format='%m/%d/%Y', errors='coerce')
     parking = parking.dropna(subset=['Issue Date'])
 
-    parking["Time Period"] = parking["Violation Time"].apply(discretize_time)
+    parking["Time Period"] = discretize_time(parking["Violation Time"])
 
-    parking["Fine Amount"] = parking["Violation Code"].map(VIOLATION_CODE_TO_FINE).fillna(0)
-    parking["Fine Level"] = parking["Fine Amount"].apply(discretize_fine)
+    parking["Fine Amount"] = parking["Violation Code"].map(violation_code_to_fine).fillna(0)
+    parking["Fine Level"] = discretize_fine(parking["Fine Amount"])
 
-    parking["Vehicle Type"] = parking["Vehicle Body Type"].apply(standardize_vehicle_type)
+    parking["Vehicle Type"] = standardize_vehicle_type(parking["Vehicle Body Type"])
 
-    parking["Borough"] = parking["Violation County"].apply(map_county_to_borough)
+    parking["Borough"] = map_county_to_borough(parking["Violation County"])
 
-    parking["Violation Description"] = parking["Violation Code"].map(VIOLATION_CODE_TO_DESC)
+    parking["Violation Description"] = parking["Violation Code"].map(violation_code_to_desc)
 
     parking = parking.dropna(subset=['Borough', 'Fine Amount', 'Violation Description'])
 
-    transactions = []
-    for _, row in parking.iterrows():
-        ordered_items = [
-            row["Borough"],
-            row["Time Period"],
-            row["Fine Level"],
-            row["Vehicle Type"],
-            str(row["Violation Code"]),
-            row["Violation Description"]
-        ]
-
-        if any(item is None or not item for item in ordered_items):
-            continue
-        if row["Vehicle Type"] in ["Other Vehicle", "Unknown Vehicle"]:
-            continue
-        valid_items = [item for item in ordered_items if "Unknown" not in item and "Other" not in item]
-        if len(valid_items) < 4:
-            continue
-        transactions.append(",".join(ordered_items))
-
-    with open("INTEGRATED-DATASET.csv", "w") as f:
-        f.write("\n".join(transactions))
+    ordered_columns = ["Borough", "Time Period", "Fine Level", "Vehicle Type", "Violation Code",
+                       "Violation Description"]
+    items = parking[ordered_columns].astype({"Violation Code": str})
+
+    has_empty_item = (items.isna() | (items == "")).any(axis=1)
+    is_known_vehicle = ~parking["Vehicle Type"].isin(["Other Vehicle", "Unknown Vehicle"])
+    valid_item_counts = (~items.apply(lambda column: column.str.contains("Unknown|Other", na=False))).sum(axis=1)
+    keep = ~has_empty_item & is_known_vehicle & (valid_item_counts >= 4)
+
+    return items[keep]
+
+
+def input_fingerprint():
+    # The cleaning code is part of the key, so editing it invalidates the cache too
+    paths = [PARKING_FILE, VIOLATION_CODES_FILE, os.path.abspath(__file__)]
+    meta = "|".join(f"{os.path.getmtime(path)}|{os.path.getsize(path)}" for path in paths)
+    return hashlib.md5(meta.encode()).hexdigest()
+
+
+def preprocess():
+    cache_file = os.path.join(CACHE_DIR, f"{input_fingerprint()}.parquet")
+    if os.path.exists(cache_file):
+        items = pd.read_parquet(cache_file)
+    else:
+        items = clean_parking_data()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        items.to_parquet(cache_file, compression="zstd")
+        # Entries for older inputs can never be hit again
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith(".parquet") and os.path.join(CACHE_DIR, name) != cache_file:
+                os.remove(os.path.join(CACHE_DIR, name))
+
+    items.to_csv("INTEGRATED-DATASET.csv", header=False, index=False)
 
 
 if __name__ == "__main__":
-    preprocess()
\ No newline at end of file
+    preprocess()